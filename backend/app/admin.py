@@ -1,5 +1,15 @@
+import hashlib
+from datetime import date
+
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db.models import Case, CharField, IntegerField, Q, Value, When
+from django.db.models.functions import Concat, ExtractYear
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 
 from .models import (
@@ -9,11 +19,95 @@ from .models import (
 )
 
 
+def patient_name_expression():
+    """Full name of the related patient, computed by the database."""
+    return Concat(
+        'patient__first_name', Value(' '), 'patient__last_name',
+        output_field=CharField()
+    )
+
+
+def doctor_name_expression():
+    """Display name of the related doctor, or NULL when no doctor is set."""
+    return Case(
+        When(doctor__isnull=True, then=Value(None)),
+        default=Concat(
+            Value('Dr. '), 'doctor__first_name', Value(' '), 'doctor__last_name',
+            output_field=CharField()
+        ),
+        output_field=CharField()
+    )
+
+
+def age_expression():
+    """Age in whole years from date_of_birth, computed by the database."""
+    today = date.today()
+    birthday_pending = Q(date_of_birth__month__gt=today.month) | Q(
+        date_of_birth__month=today.month, date_of_birth__day__gt=today.day
+    )
+    return Value(today.year) - ExtractYear('date_of_birth') - Case(
+        When(birthday_pending, then=Value(1)),
+        default=Value(0),
+        output_field=IntegerField()
+    )
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator that keeps changelist row counts in the cache for a short time.
+    Counts are keyed by model and by the SQL of the filtered queryset
+    (ignoring ordering), so each combination of filters and search terms
+    is cached separately.
+    """
+    count_timeout = 30
+
+    @cached_property
+    def count(self):
+        try:
+            sql = str(self.object_list.order_by().query)
+        except EmptyResultSet:
+            return 0
+        key = 'admin-count:{}:{}'.format(
+            self.object_list.model._meta.label,
+            hashlib.md5(sql.encode(), usedforsecurity=False).hexdigest()
+        )
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.set(key, count, self.count_timeout)
+        return count
+
+
+class DeferredChangeList(ChangeList):
+    """
+    Changelist that loads only the model admin's list_only columns. Only the
+    changelist is affected; the change form still loads every field in one
+    query.
+    """
+    def get_queryset(self, request, exclude_parameters=None):
+        queryset = super().get_queryset(request, exclude_parameters)
+        if self.model_admin.list_only:
+            queryset = queryset.only(*self.model_admin.list_only)
+        return queryset
+
+
+class DeferredListMixin:
+    """
+    Mixin for model admins whose changelist needs only some of the model's columns.
+    """
+    list_only = ()
+
+    def get_changelist(self, request, **kwargs):
+        return DeferredChangeList
+
+
 @admin.register(User)
-class UserAdmin(BaseUserAdmin):
-    list_display = ('email', 'first_name', 'last_name', 'user_type', 'is_staff', 'is_active')
+class UserAdmin(DeferredListMixin, BaseUserAdmin):
+    list_display = ('email', 'sort_name', 'user_type', 'is_staff', 'is_active')
+    paginator = CachedCountPaginator
     list_filter = ('user_type', 'is_staff', 'is_active')
-    search_fields = ('email', 'first_name', 'last_name', 'phone_number')
+    search_fields = ('=email', '^sort_name', '^first_name', '^phone_number')
+    list_only = ('id', 'email', 'first_name', 'last_name', 'sort_name', 'user_type', 'is_staff', 'is_active')
     ordering = ('email',)
     
     fieldsets = (
@@ -47,12 +141,14 @@ class DoctorInline(admin.StackedInline):
 
 
 @admin.register(Patient)
-class PatientAdmin(admin.ModelAdmin):
+class PatientAdmin(DeferredListMixin, admin.ModelAdmin):
     list_display = ('id', 'name', 'gender', 'date_of_birth', 'age', 'insurance_type')
+    paginator = CachedCountPaginator
     list_filter = ('gender', 'insurance_type')
-    search_fields = ('user__first_name', 'user__last_name', 'user__email')
+    search_fields = ('^first_name', '^last_name', '=user__email')
+    list_only = ('id', 'first_name', 'last_name', 'gender', 'date_of_birth', 'insurance_type')
     readonly_fields = ('id', 'age')
-    raw_id_fields = ('user',)
+    autocomplete_fields = ('user',)
     
     fieldsets = (
         (_('Identity'), {'fields': ('id', 'user')}),
@@ -60,17 +156,27 @@ class PatientAdmin(admin.ModelAdmin):
         (_('Medical Info'), {'fields': ('insurance_type', 'emergency_contact')}),
     )
     
+    def age(self, obj):
+        return obj._age
+    age.short_description = _('Age')
+    age.admin_order_field = '_age'
+    
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('user')
+        return super().get_queryset(request).annotate(_age=age_expression())
 
 
 @admin.register(Doctor)
-class DoctorAdmin(admin.ModelAdmin):
+class DoctorAdmin(DeferredListMixin, admin.ModelAdmin):
     list_display = ('id', 'name', 'specialization', 'license_number', 'years_of_experience', 'accepting_new_patients')
+    paginator = CachedCountPaginator
     list_filter = ('specialization', 'accepting_new_patients')
-    search_fields = ('user__first_name', 'user__last_name', 'user__email', 'license_number')
+    search_fields = ('^first_name', '^last_name', '=user__email', '=license_number')
+    list_only = (
+        'id', 'first_name', 'last_name', 'specialization', 'license_number',
+        'years_of_experience', 'accepting_new_patients'
+    )
     readonly_fields = ('id',)
-    raw_id_fields = ('user',)
+    autocomplete_fields = ('user',)
     
     fieldsets = (
         (_('Identity'), {'fields': ('id', 'user')}),
@@ -78,17 +184,23 @@ class DoctorAdmin(admin.ModelAdmin):
         (_('Status'), {'fields': ('accepting_new_patients',)}),
         (_('Biography'), {'fields': ('biography',)}),
     )
-    
-    def get_queryset(self, request):
-        return super().get_queryset(request).select_related('user')
 
 
 @admin.register(DiagnosisHistory)
-class DiagnosisHistoryAdmin(admin.ModelAdmin):
+class DiagnosisHistoryAdmin(DeferredListMixin, admin.ModelAdmin):
     list_display = ('id', 'patient_name', 'doctor_name', 'month', 'year', 'systolic_status', 'diastolic_status', 'heart_rate_status')
+    paginator = CachedCountPaginator
+    show_full_result_count = False
     list_filter = ('month', 'year', 'blood_pressure_systolic_levels', 'blood_pressure_diastolic_levels', 'heart_rate_levels')
-    search_fields = ('patient__user__first_name', 'patient__user__last_name', 'doctor__user__last_name')
-    raw_id_fields = ('patient', 'doctor')
+    search_fields = ('^patient__first_name', '^patient__last_name', '^doctor__last_name')
+    list_only = (
+        'id', 'month', 'year', 'blood_pressure_systolic_levels',
+        'blood_pressure_diastolic_levels', 'heart_rate_levels',
+        'patient__first_name', 'patient__last_name', 'doctor__first_name', 'doctor__last_name'
+    )
+    autocomplete_fields = ('patient', 'doctor')
+    list_select_related = ('patient', 'doctor')
+    _LEVEL_DISPLAY = dict(DiagnosisHistory.Level.choices)
     
     fieldsets = (
         (_('Basic Info'), {'fields': ('id', 'patient', 'doctor', 'month', 'year')}),
@@ -107,40 +219,49 @@ class DiagnosisHistoryAdmin(admin.ModelAdmin):
     readonly_fields = ('id', 'created_at', 'updated_at')
     
     def patient_name(self, obj):
-        return obj.patient.name
+        return obj._patient_name
     patient_name.short_description = _('Patient')
-    patient_name.admin_order_field = 'patient__user__last_name'
+    patient_name.admin_order_field = '_patient_name'
     
     def doctor_name(self, obj):
-        return obj.doctor.name if obj.doctor else '-'
+        return obj._doctor_name or '-'
     doctor_name.short_description = _('Doctor')
-    doctor_name.admin_order_field = 'doctor__user__last_name'
+    doctor_name.admin_order_field = '_doctor_name'
     
     def systolic_status(self, obj):
-        return obj.get_blood_pressure_systolic_levels_display()
+        return self._LEVEL_DISPLAY.get(obj.blood_pressure_systolic_levels, '-')
     systolic_status.short_description = _('Systolic Status')
     systolic_status.admin_order_field = 'blood_pressure_systolic_levels'
     
     def diastolic_status(self, obj):
-        return obj.get_blood_pressure_diastolic_levels_display()
+        return self._LEVEL_DISPLAY.get(obj.blood_pressure_diastolic_levels, '-')
     diastolic_status.short_description = _('Diastolic Status')
     diastolic_status.admin_order_field = 'blood_pressure_diastolic_levels'
     
     def heart_rate_status(self, obj):
-        return obj.get_heart_rate_levels_display()
+        return self._LEVEL_DISPLAY.get(obj.heart_rate_levels, '-')
     heart_rate_status.short_description = _('Heart Rate Status')
     heart_rate_status.admin_order_field = 'heart_rate_levels'
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('patient__user', 'doctor__user')
+        return super().get_queryset(request).annotate(
+            _patient_name=patient_name_expression(),
+            _doctor_name=doctor_name_expression(),
+        )
 
 
 @admin.register(DiagnosticList)
-class DiagnosticListAdmin(admin.ModelAdmin):
+class DiagnosticListAdmin(DeferredListMixin, admin.ModelAdmin):
     list_display = ('id', 'patient_name', 'doctor_name', 'name', 'status', 'diagnosed_date')
+    paginator = CachedCountPaginator
     list_filter = ('status', 'diagnosed_date')
-    search_fields = ('patient__user__first_name', 'patient__user__last_name', 'doctor__user__last_name', 'name')
-    raw_id_fields = ('patient', 'doctor')
+    search_fields = ('^patient__first_name', '^patient__last_name', '^doctor__last_name', '^name')
+    list_only = (
+        'id', 'name', 'status', 'diagnosed_date',
+        'patient__first_name', 'patient__last_name', 'doctor__first_name', 'doctor__last_name'
+    )
+    autocomplete_fields = ('patient', 'doctor')
+    list_select_related = ('patient', 'doctor')
     
     fieldsets = (
         (_('Basic Info'), {'fields': ('id', 'patient', 'doctor')}),
@@ -151,25 +272,35 @@ class DiagnosticListAdmin(admin.ModelAdmin):
     readonly_fields = ('id', 'created_at', 'updated_at')
     
     def patient_name(self, obj):
-        return obj.patient.name
+        return obj._patient_name
     patient_name.short_description = _('Patient')
-    patient_name.admin_order_field = 'patient__user__last_name'
+    patient_name.admin_order_field = '_patient_name'
     
     def doctor_name(self, obj):
-        return obj.doctor.name if obj.doctor else '-'
+        return obj._doctor_name or '-'
     doctor_name.short_description = _('Doctor')
-    doctor_name.admin_order_field = 'doctor__user__last_name'
+    doctor_name.admin_order_field = '_doctor_name'
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('patient__user', 'doctor__user')
+        return super().get_queryset(request).annotate(
+            _patient_name=patient_name_expression(),
+            _doctor_name=doctor_name_expression(),
+        )
 
 
 @admin.register(LabResult)
-class LabResultAdmin(admin.ModelAdmin):
+class LabResultAdmin(DeferredListMixin, admin.ModelAdmin):
     list_display = ('id', 'patient_name', 'doctor_name', 'name', 'result_value', 'result_unit', 'status', 'performed_date')
+    paginator = CachedCountPaginator
+    show_full_result_count = False
     list_filter = ('status', 'performed_date', 'reported_date')
-    search_fields = ('patient__user__first_name', 'patient__user__last_name', 'doctor__user__last_name', 'name')
-    raw_id_fields = ('patient', 'doctor')
+    search_fields = ('^patient__first_name', '^patient__last_name', '^doctor__last_name', '^name')
+    list_only = (
+        'id', 'name', 'result_value', 'result_unit', 'status', 'performed_date',
+        'patient__first_name', 'patient__last_name', 'doctor__first_name', 'doctor__last_name'
+    )
+    autocomplete_fields = ('patient', 'doctor')
+    list_select_related = ('patient', 'doctor')
     
     fieldsets = (
         (_('Basic Info'), {'fields': ('id', 'patient', 'doctor')}),
@@ -182,25 +313,34 @@ class LabResultAdmin(admin.ModelAdmin):
     readonly_fields = ('id', 'created_at', 'updated_at')
     
     def patient_name(self, obj):
-        return obj.patient.name
+        return obj._patient_name
     patient_name.short_description = _('Patient')
-    patient_name.admin_order_field = 'patient__user__last_name'
+    patient_name.admin_order_field = '_patient_name'
     
     def doctor_name(self, obj):
-        return obj.doctor.name if obj.doctor else '-'
+        return obj._doctor_name or '-'
     doctor_name.short_description = _('Doctor')
-    doctor_name.admin_order_field = 'doctor__user__last_name'
+    doctor_name.admin_order_field = '_doctor_name'
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('patient__user', 'doctor__user')
+        return super().get_queryset(request).annotate(
+            _patient_name=patient_name_expression(),
+            _doctor_name=doctor_name_expression(),
+        )
 
 
 @admin.register(Appointment)
-class AppointmentAdmin(admin.ModelAdmin):
+class AppointmentAdmin(DeferredListMixin, admin.ModelAdmin):
     list_display = ('id', 'patient_name', 'doctor_name', 'appointment_date', 'appointment_time', 'appointment_type', 'status')
+    paginator = CachedCountPaginator
     list_filter = ('status', 'appointment_type', 'appointment_date')
-    search_fields = ('patient__user__first_name', 'patient__user__last_name', 'doctor__user__last_name', 'reason')
-    raw_id_fields = ('patient', 'doctor')
+    search_fields = ('^patient__first_name', '^patient__last_name', '^doctor__last_name')
+    list_only = (
+        'id', 'appointment_date', 'appointment_time', 'appointment_type', 'status',
+        'patient__first_name', 'patient__last_name', 'doctor__first_name', 'doctor__last_name'
+    )
+    autocomplete_fields = ('patient', 'doctor')
+    list_select_related = ('patient', 'doctor')
     
     fieldsets = (
         (_('Basic Info'), {'fields': ('id', 'patient', 'doctor')}),
@@ -212,14 +352,17 @@ class AppointmentAdmin(admin.ModelAdmin):
     readonly_fields = ('id', 'created_at', 'updated_at')
     
     def patient_name(self, obj):
-        return obj.patient.name
+        return obj._patient_name
     patient_name.short_description = _('Patient')
-    patient_name.admin_order_field = 'patient__user__last_name'
+    patient_name.admin_order_field = '_patient_name'
     
     def doctor_name(self, obj):
-        return obj.doctor.name
+        return obj._doctor_name or '-'
     doctor_name.short_description = _('Doctor')
-    doctor_name.admin_order_field = 'doctor__user__last_name'
+    doctor_name.admin_order_field = '_doctor_name'
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('patient__user', 'doctor__user')
\ No newline at end of file
+        return super().get_queryset(request).annotate(
+            _patient_name=patient_name_expression(),
+            _doctor_name=doctor_name_expression(),
+        )
\ No newline at end of file
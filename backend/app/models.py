@@ -1,14 +1,59 @@
 from django.db import models
+from django.db.models.functions import Concat
 from django.core.validators import RegexValidator, MinValueValidator, MaxValueValidator
+from django.utils import timezone
+from django.utils.dates import MONTHS
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth.models import AbstractUser, BaseUserManager
+from datetime import date
+from functools import lru_cache
+import os
+import time
 import uuid
 
 
+def uuid7():
+    """
+    Generate a time-ordered UUID (RFC 9562 version 7).
+    Keys from consecutive inserts sort together, so new rows land at the
+    end of the primary key index instead of on random pages.
+    """
+    timestamp_ms = time.time_ns() // 1_000_000
+    value = (timestamp_ms & 0xFFFFFFFFFFFF) << 80 | int.from_bytes(os.urandom(10), 'big')
+    value = (value & ~(0xF << 76)) | (0x7 << 76)
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)
+    return uuid.UUID(int=value)
+
+
+@lru_cache(maxsize=8192)
+def _compute_age(born, today):
+    """Whole years between two dates, memoized per (born, today) pair."""
+    return today.year - born.year - ((today.month, today.day) < (born.month, born.day))
+
+
+class LicenseNumberField(models.CharField):
+    """
+    CharField that stores license numbers stripped and uppercased.
+    Normalizing in to_python() runs before the max_length and unique checks,
+    so padded or lowercase variants validate as the stored value.
+    """
+    def to_python(self, value):
+        value = super().to_python(value)
+        return value.strip().upper() if isinstance(value, str) else value
+
+
 class UserManager(BaseUserManager):
     """
     Custom user manager for handling both Patient and Doctor user creation
     """
+    @classmethod
+    def normalize_email(cls, email):
+        # Store addresses lowercased so exact lookups are case-insensitive
+        return super().normalize_email(email).lower()
+
+    def get_by_natural_key(self, username):
+        return self.get(**{self.model.USERNAME_FIELD: self.normalize_email(username)})
+
     def create_user(self, email, password=None, **extra_fields):
         if not email:
             raise ValueError(_('Users must have an email address'))
@@ -52,6 +97,12 @@ class User(AbstractUser):
         blank=True
     )
     profile_picture = models.URLField(_('Profile Picture'), blank=True, null=True)
+    sort_name = models.GeneratedField(
+        expression=Concat('last_name', models.Value(', '), 'first_name'),
+        output_field=models.CharField(max_length=302),
+        db_persist=True,
+        verbose_name=_('Name')
+    )
     created_at = models.DateTimeField(_('Created At'), auto_now_add=True)
     updated_at = models.DateTimeField(_('Updated At'), auto_now=True)
 
@@ -67,6 +118,8 @@ class User(AbstractUser):
         indexes = [
             models.Index(fields=['email']),
             models.Index(fields=['user_type']),
+            models.Index(fields=['sort_name']),
+            models.Index(fields=['first_name']),
         ]
 
     def __str__(self):
@@ -76,8 +129,66 @@ class User(AbstractUser):
     def full_name(self):
         return self.get_full_name()
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored name so save() only syncs profiles when it changes
+        instance._loaded_names = (
+            instance.__dict__.get('first_name'),
+            instance.__dict__.get('last_name'),
+        )
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        # Reloaded (or lazily loaded deferred) names are the new stored baseline
+        loaded = getattr(self, '_loaded_names', (None, None))
+        self._loaded_names = tuple(
+            self.__dict__.get(name) if fields is None or name in fields else previous
+            for name, previous in zip(('first_name', 'last_name'), loaded)
+        )
 
-class Patient(models.Model):
+    def save(self, *args, **kwargs):
+        """
+        Save the user and copy a changed name onto its patient/doctor profile.
+        QuerySet.update() and bulk_update() bypass this and leave the
+        profile copies stale.
+        """
+        adding = self._state.adding
+        self.email = self.__class__.objects.normalize_email(self.email)
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not {'first_name', 'last_name'} & set(update_fields):
+            return
+        names = (self.first_name, self.last_name)
+        if not adding and names != getattr(self, '_loaded_names', None):
+            Patient.objects.filter(user=self).update(first_name=names[0], last_name=names[1])
+            Doctor.objects.filter(user=self).update(first_name=names[0], last_name=names[1])
+        self._loaded_names = names
+
+
+class NamedProfile(models.Model):
+    """
+    Abstract base for user profiles that keep a copy of the user's name.
+    Listing, ordering and searching profiles by name then needs no join
+    on the user table.
+    """
+    first_name = models.CharField(_('First Name'), max_length=150, blank=True, editable=False)
+    last_name = models.CharField(_('Last Name'), max_length=150, blank=True, editable=False)
+    
+    class Meta:
+        abstract = True
+    
+    def save(self, *args, **kwargs):
+        self.first_name = self.user.first_name
+        self.last_name = self.user.last_name
+        super().save(*args, **kwargs)
+    
+    def get_full_name(self):
+        return f"{self.first_name} {self.last_name}".strip()
+
+
+class Patient(NamedProfile):
     """
     Model representing a patient in the healthcare system.
     Extends the User model with patient-specific information.
@@ -96,7 +207,7 @@ class Patient(models.Model):
         ('other', _('Other')),
     ]
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     user = models.OneToOneField(
         User, 
         on_delete=models.CASCADE, 
@@ -121,14 +232,15 @@ class Patient(models.Model):
     class Meta:
         verbose_name = _('Patient')
         verbose_name_plural = _('Patients')
-        ordering = ['user__last_name', 'user__first_name']
+        ordering = ['last_name', 'first_name']
         indexes = [
             models.Index(fields=['user']),
+            models.Index(fields=['last_name', 'first_name']),
             models.Index(fields=['date_of_birth']),
         ]
     
     def __str__(self):
-        return f"{self.user.get_full_name()} ({self.id})"
+        return f"{self.get_full_name()} ({self.id})"
     
     def get_absolute_url(self):
         from django.urls import reverse
@@ -136,18 +248,15 @@ class Patient(models.Model):
     
     @property
     def name(self):
-        return self.user.get_full_name()
+        return self.get_full_name()
     
     @property
     def age(self):
         """Calculate age from date of birth."""
-        from datetime import date
-        today = date.today()
-        born = self.date_of_birth
-        return today.year - born.year - ((today.month, today.day) < (born.month, born.day))
+        return _compute_age(self.date_of_birth, date.today())
 
 
-class Doctor(models.Model):
+class Doctor(NamedProfile):
     """
     Model representing a doctor in the healthcare system.
     Extends the User model with doctor-specific information.
@@ -167,7 +276,7 @@ class Doctor(models.Model):
         ('other', _('Other')),
     ]
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     user = models.OneToOneField(
         User, 
         on_delete=models.CASCADE, 
@@ -179,7 +288,7 @@ class Doctor(models.Model):
         max_length=50, 
         choices=SPECIALIZATION_CHOICES
     )
-    license_number = models.CharField(_('License Number'), max_length=50, unique=True)
+    license_number = LicenseNumberField(_('License Number'), max_length=50, unique=True)
     biography = models.TextField(_('Biography'), blank=True)
     years_of_experience = models.PositiveIntegerField(
         _('Years of Experience'), 
@@ -191,14 +300,26 @@ class Doctor(models.Model):
     class Meta:
         verbose_name = _('Doctor')
         verbose_name_plural = _('Doctors')
-        ordering = ['user__last_name', 'user__first_name']
+        ordering = ['last_name', 'first_name']
         indexes = [
             models.Index(fields=['user']),
+            models.Index(fields=['last_name', 'first_name']),
             models.Index(fields=['specialization']),
+            models.Index(fields=['accepting_new_patients', 'specialization']),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(years_of_experience__lte=70),
+                name='doctor_years_of_experience_max'
+            )
         ]
     
     def __str__(self):
-        return f"Dr. {self.user.get_full_name()} ({self.get_specialization_display()})"
+        return f"Dr. {self.get_full_name()} ({self.get_specialization_display()})"
+    
+    def save(self, *args, **kwargs):
+        self.license_number = self._meta.get_field('license_number').to_python(self.license_number)
+        super().save(*args, **kwargs)
     
     def get_absolute_url(self):
         from django.urls import reverse
@@ -206,11 +327,36 @@ class Doctor(models.Model):
     
     @property
     def name(self):
-        return f"Dr. {self.user.get_full_name()}"
+        return f"Dr. {self.get_full_name()}"
     
     @property
     def full_name(self):
-        return self.user.get_full_name()
+        return self.get_full_name()
+
+
+class DiagnosisHistoryManager(models.Manager):
+    """
+    Manager for diagnosis history records
+    """
+    def recompute_levels(self, queryset=None):
+        """
+        Derive every *_levels column from its *_value column in a single UPDATE.
+        Returns the number of rows updated.
+        """
+        if queryset is None:
+            queryset = self.get_queryset()
+        Level = self.model.Level
+        levels = {
+            f'{metric}_levels': models.Case(
+                *[
+                    models.When(**{f'{metric}_value__lt': bound}, then=models.Value(level))
+                    for bound, level in thresholds
+                ],
+                default=models.Value(Level.CRITICAL_HIGH)
+            )
+            for metric, thresholds in self.model.LEVEL_THRESHOLDS.items()
+        }
+        return queryset.update(updated_at=timezone.now(), **levels)
 
 
 class DiagnosisHistory(models.Model):
@@ -218,15 +364,54 @@ class DiagnosisHistory(models.Model):
     Model representing a patient's health metrics recorded over time.
     Each record is for a specific month and year.
     """
-    LEVEL_CHOICES = [
-        ('normal', _('Normal')),
-        ('lower_than_average', _('Lower than Average')),
-        ('higher_than_average', _('Higher than Average')),
-        ('critical_low', _('Critical Low')),
-        ('critical_high', _('Critical High')),
-    ]
-    
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    class Level(models.IntegerChoices):
+        NORMAL = 0, _('Normal')
+        LOWER_THAN_AVERAGE = 1, _('Lower than Average')
+        HIGHER_THAN_AVERAGE = 2, _('Higher than Average')
+        CRITICAL_LOW = 3, _('Critical Low')
+        CRITICAL_HIGH = 4, _('Critical High')
+
+    # Exclusive upper bound of each level per metric, checked in order;
+    # anything at or above the last bound is critical high.
+    # Normal ranges follow the usual adult reference values: blood pressure
+    # below 120/80 mmHg (2017 ACC/AHA "normal") and at least 90/60 (below is
+    # hypotension), with 180/120 as the hypertensive-crisis line; resting
+    # heart rate 60-100 bpm; respiratory rate 12-20 breaths/min; temperature
+    # 97.0-99.5 F. The critical-low bounds are this project's own cut-offs.
+    LEVEL_THRESHOLDS = {
+        'blood_pressure_systolic': (
+            (70, Level.CRITICAL_LOW),
+            (90, Level.LOWER_THAN_AVERAGE),
+            (120, Level.NORMAL),
+            (180, Level.HIGHER_THAN_AVERAGE),
+        ),
+        'blood_pressure_diastolic': (
+            (40, Level.CRITICAL_LOW),
+            (60, Level.LOWER_THAN_AVERAGE),
+            (80, Level.NORMAL),
+            (120, Level.HIGHER_THAN_AVERAGE),
+        ),
+        'heart_rate': (
+            (40, Level.CRITICAL_LOW),
+            (60, Level.LOWER_THAN_AVERAGE),
+            (101, Level.NORMAL),
+            (150, Level.HIGHER_THAN_AVERAGE),
+        ),
+        'respiratory_rate': (
+            (8, Level.CRITICAL_LOW),
+            (12, Level.LOWER_THAN_AVERAGE),
+            (21, Level.NORMAL),
+            (30, Level.HIGHER_THAN_AVERAGE),
+        ),
+        'temperature': (
+            (95.0, Level.CRITICAL_LOW),
+            (97.0, Level.LOWER_THAN_AVERAGE),
+            (99.6, Level.NORMAL),
+            (103.0, Level.HIGHER_THAN_AVERAGE),
+        ),
+    }
+    
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     patient = models.ForeignKey(
         Patient, 
         on_delete=models.CASCADE,
@@ -241,7 +426,11 @@ class DiagnosisHistory(models.Model):
         null=True,
         blank=True
     )
-    month = models.CharField(_('Month'), max_length=10)
+    month = models.PositiveSmallIntegerField(
+        _('Month'),
+        choices=MONTHS,
+        validators=[MinValueValidator(1), MaxValueValidator(12)]
+    )
     year = models.PositiveIntegerField(
         _('Year'),
         validators=[MinValueValidator(1900), MaxValueValidator(2100)]
@@ -252,11 +441,10 @@ class DiagnosisHistory(models.Model):
         _('Systolic Blood Pressure Value'),
         validators=[MinValueValidator(50), MaxValueValidator(250)]
     )
-    blood_pressure_systolic_levels = models.CharField(
+    blood_pressure_systolic_levels = models.PositiveSmallIntegerField(
         _('Systolic Blood Pressure Levels'),
-        max_length=25,
-        choices=LEVEL_CHOICES,
-        default='normal'
+        choices=Level.choices,
+        default=Level.NORMAL
     )
     
     # Blood pressure - diastolic
@@ -264,11 +452,10 @@ class DiagnosisHistory(models.Model):
         _('Diastolic Blood Pressure Value'),
         validators=[MinValueValidator(30), MaxValueValidator(150)]
     )
-    blood_pressure_diastolic_levels = models.CharField(
+    blood_pressure_diastolic_levels = models.PositiveSmallIntegerField(
         _('Diastolic Blood Pressure Levels'),
-        max_length=25,
-        choices=LEVEL_CHOICES,
-        default='normal'
+        choices=Level.choices,
+        default=Level.NORMAL
     )
     
     # Heart rate
@@ -276,11 +463,10 @@ class DiagnosisHistory(models.Model):
         _('Heart Rate Value'),
         validators=[MinValueValidator(30), MaxValueValidator(220)]
     )
-    heart_rate_levels = models.CharField(
+    heart_rate_levels = models.PositiveSmallIntegerField(
         _('Heart Rate Levels'),
-        max_length=25,
-        choices=LEVEL_CHOICES,
-        default='normal'
+        choices=Level.choices,
+        default=Level.NORMAL
     )
     
     # Respiratory rate
@@ -288,11 +474,10 @@ class DiagnosisHistory(models.Model):
         _('Respiratory Rate Value'),
         validators=[MinValueValidator(5), MaxValueValidator(60)]
     )
-    respiratory_rate_levels = models.CharField(
+    respiratory_rate_levels = models.PositiveSmallIntegerField(
         _('Respiratory Rate Levels'),
-        max_length=25,
-        choices=LEVEL_CHOICES,
-        default='normal'
+        choices=Level.choices,
+        default=Level.NORMAL
     )
     
     # Temperature
@@ -300,16 +485,17 @@ class DiagnosisHistory(models.Model):
         _('Temperature Value'),
         validators=[MinValueValidator(95.0), MaxValueValidator(108.0)]
     )
-    temperature_levels = models.CharField(
+    temperature_levels = models.PositiveSmallIntegerField(
         _('Temperature Levels'),
-        max_length=25,
-        choices=LEVEL_CHOICES,
-        default='normal'
+        choices=Level.choices,
+        default=Level.NORMAL
     )
     
     created_at = models.DateTimeField(_('Created At'), auto_now_add=True)
     updated_at = models.DateTimeField(_('Updated At'), auto_now=True)
     
+    objects = DiagnosisHistoryManager()
+    
     class Meta:
         verbose_name = _('Diagnosis History')
         verbose_name_plural = _('Diagnosis Histories')
@@ -322,11 +508,39 @@ class DiagnosisHistory(models.Model):
             models.UniqueConstraint(
                 fields=['patient', 'month', 'year'],
                 name='unique_patient_diagnosis_history'
-            )
+            ),
+            models.CheckConstraint(
+                condition=models.Q(month__range=(1, 12)),
+                name='diagnosis_history_month_range'
+            ),
+            models.CheckConstraint(
+                condition=models.Q(year__range=(1900, 2100)),
+                name='diagnosis_history_year_range'
+            ),
+            models.CheckConstraint(
+                condition=models.Q(blood_pressure_systolic_value__range=(50, 250)),
+                name='diagnosis_history_systolic_range'
+            ),
+            models.CheckConstraint(
+                condition=models.Q(blood_pressure_diastolic_value__range=(30, 150)),
+                name='diagnosis_history_diastolic_range'
+            ),
+            models.CheckConstraint(
+                condition=models.Q(heart_rate_value__range=(30, 220)),
+                name='diagnosis_history_heart_rate_range'
+            ),
+            models.CheckConstraint(
+                condition=models.Q(respiratory_rate_value__range=(5, 60)),
+                name='diagnosis_history_respiratory_rate_range'
+            ),
+            models.CheckConstraint(
+                condition=models.Q(temperature_value__range=(95.0, 108.0)),
+                name='diagnosis_history_temperature_range'
+            ),
         ]
     
     def __str__(self):
-        return f"{self.patient.name} - {self.month} {self.year}"
+        return f"{self.patient.name} - {self.get_month_display()} {self.year}"
 
 
 class DiagnosticList(models.Model):
@@ -341,7 +555,7 @@ class DiagnosticList(models.Model):
         ('chronic', _('Chronic')),
     ]
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     patient = models.ForeignKey(
         Patient, 
         on_delete=models.CASCADE,
@@ -375,6 +589,7 @@ class DiagnosticList(models.Model):
         indexes = [
             models.Index(fields=['patient', 'name']),
             models.Index(fields=['doctor']),
+            models.Index(fields=['name']),
             models.Index(fields=['status']),
         ]
     
@@ -393,7 +608,7 @@ class LabResult(models.Model):
         ('pending', _('Pending')),
     ]
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     patient = models.ForeignKey(
         Patient, 
         on_delete=models.CASCADE,
@@ -461,7 +676,7 @@ class Appointment(models.Model):
         ('other', _('Other')),
     ]
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     patient = models.ForeignKey(
         Patient,
         on_delete=models.CASCADE,
@@ -501,6 +716,7 @@ class Appointment(models.Model):
             models.Index(fields=['patient', '-appointment_date']),
             models.Index(fields=['doctor', '-appointment_date']),
             models.Index(fields=['status']),
+            models.Index(fields=['doctor', 'status', 'appointment_date']),
         ]
         constraints = [
             models.UniqueConstraint(
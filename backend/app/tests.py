@@ -1,3 +1,445 @@
-from django.test import TestCase
+import time as time_module
+import uuid
+from datetime import date, time, timedelta
+from itertools import count
+from unittest import mock
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth import authenticate
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, transaction
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .admin import CachedCountPaginator, age_expression
+from .models import (
+    uuid7,
+    User, Patient, Doctor,
+    DiagnosisHistory, DiagnosticList,
+    LabResult, Appointment
+)
+
+
+_sequence = count(1)
+
+
+def make_user(user_type='patient', **extra_fields):
+    n = next(_sequence)
+    extra_fields.setdefault('email', f'user{n}@example.com')
+    extra_fields.setdefault('first_name', f'First{n}')
+    extra_fields.setdefault('last_name', f'Last{n}')
+    return User.objects.create_user(password='s3cret-pass', user_type=user_type, **extra_fields)
+
+
+def make_patient(**fields):
+    fields.setdefault('gender', 'F')
+    fields.setdefault('date_of_birth', date(1980, 6, 15))
+    return Patient.objects.create(user=make_user('patient'), **fields)
+
+
+def make_doctor(**fields):
+    fields.setdefault('specialization', 'general_practitioner')
+    fields.setdefault('license_number', f'LIC-{next(_sequence)}')
+    return Doctor.objects.create(user=make_user('doctor'), **fields)
+
+
+class RecomputeLevelsTests(TestCase):
+    Level = DiagnosisHistory.Level
+
+    # Normal readings for every metric; each case overrides one of them
+    BASELINE = {
+        'blood_pressure_systolic_value': 110,
+        'blood_pressure_diastolic_value': 70,
+        'heart_rate_value': 70,
+        'respiratory_rate_value': 16,
+        'temperature_value': 98.6,
+    }
+
+    # (value, expected level) on both sides of every threshold
+    CASES = {
+        'blood_pressure_systolic': [
+            (69, Level.CRITICAL_LOW), (70, Level.LOWER_THAN_AVERAGE),
+            (89, Level.LOWER_THAN_AVERAGE), (90, Level.NORMAL),
+            (119, Level.NORMAL), (120, Level.HIGHER_THAN_AVERAGE),
+            (179, Level.HIGHER_THAN_AVERAGE), (180, Level.CRITICAL_HIGH),
+        ],
+        'blood_pressure_diastolic': [
+            (39, Level.CRITICAL_LOW), (40, Level.LOWER_THAN_AVERAGE),
+            (59, Level.LOWER_THAN_AVERAGE), (60, Level.NORMAL),
+            (79, Level.NORMAL), (80, Level.HIGHER_THAN_AVERAGE),
+            (119, Level.HIGHER_THAN_AVERAGE), (120, Level.CRITICAL_HIGH),
+        ],
+        'heart_rate': [
+            (39, Level.CRITICAL_LOW), (40, Level.LOWER_THAN_AVERAGE),
+            (59, Level.LOWER_THAN_AVERAGE), (60, Level.NORMAL),
+            (100, Level.NORMAL), (101, Level.HIGHER_THAN_AVERAGE),
+            (149, Level.HIGHER_THAN_AVERAGE), (150, Level.CRITICAL_HIGH),
+        ],
+        'respiratory_rate': [
+            (7, Level.CRITICAL_LOW), (8, Level.LOWER_THAN_AVERAGE),
+            (11, Level.LOWER_THAN_AVERAGE), (12, Level.NORMAL),
+            (20, Level.NORMAL), (21, Level.HIGHER_THAN_AVERAGE),
+            (29, Level.HIGHER_THAN_AVERAGE), (30, Level.CRITICAL_HIGH),
+        ],
+        # 95.0 is the lowest value the range constraint allows, so critical
+        # low cannot be stored for temperature
+        'temperature': [
+            (95.0, Level.LOWER_THAN_AVERAGE), (96.9, Level.LOWER_THAN_AVERAGE),
+            (97.0, Level.NORMAL), (99.5, Level.NORMAL),
+            (99.6, Level.HIGHER_THAN_AVERAGE), (102.9, Level.HIGHER_THAN_AVERAGE),
+            (103.0, Level.CRITICAL_HIGH),
+        ],
+    }
+
+    def setUp(self):
+        self.patient = make_patient()
+        self.years = count(1900)
+
+    def create_history(self, **values):
+        return DiagnosisHistory.objects.create(
+            patient=self.patient,
+            month=1,
+            year=next(self.years),
+            **dict(self.BASELINE, **values)
+        )
+
+    def test_levels_at_each_threshold_edge(self):
+        rows = []
+        for metric, cases in self.CASES.items():
+            for value, level in cases:
+                history = self.create_history(**{f'{metric}_value': value})
+                rows.append((history, metric, value, level))
+
+        updated = DiagnosisHistory.objects.recompute_levels()
+
+        self.assertEqual(updated, len(rows))
+        for history, metric, value, level in rows:
+            history.refresh_from_db()
+            with self.subTest(metric=metric, value=value):
+                self.assertEqual(getattr(history, f'{metric}_levels'), level)
+                for other in self.CASES:
+                    if other != metric:
+                        self.assertEqual(getattr(history, f'{other}_levels'), self.Level.NORMAL)
+
+    def test_only_given_queryset_is_updated(self):
+        included = self.create_history(heart_rate_value=150)
+        excluded = self.create_history(heart_rate_value=150)
+
+        updated = DiagnosisHistory.objects.recompute_levels(
+            DiagnosisHistory.objects.filter(pk=included.pk)
+        )
+
+        self.assertEqual(updated, 1)
+        included.refresh_from_db()
+        excluded.refresh_from_db()
+        self.assertEqual(included.heart_rate_levels, self.Level.CRITICAL_HIGH)
+        self.assertEqual(excluded.heart_rate_levels, self.Level.NORMAL)
+
+
+class ProfileNameSyncTests(TestCase):
+    def setUp(self):
+        self.patient = make_patient()
+
+    def test_name_change_is_copied_to_profile(self):
+        user = User.objects.get(pk=self.patient.user_id)
+        user.first_name = 'Patty'
+        user.save()
+
+        self.patient.refresh_from_db()
+        self.assertEqual(self.patient.first_name, 'Patty')
+        self.assertEqual(self.patient.name, f'Patty {user.last_name}')
+
+    def test_save_without_name_change_skips_profile_update(self):
+        user = User.objects.get(pk=self.patient.user_id)
+        user.phone_number = '+15551234567'
+
+        with self.assertNumQueries(1):
+            user.save()
+
+    def test_update_fields_without_name_skips_profile_update(self):
+        user = User.objects.get(pk=self.patient.user_id)
+        user.first_name = 'Patty'
+
+        with self.assertNumQueries(1):
+            user.save(update_fields=['phone_number'])
+
+    def test_name_restored_after_refresh_is_copied_to_profile(self):
+        user = User.objects.get(pk=self.patient.user_id)
+        original = user.first_name
+        other = User.objects.get(pk=user.pk)
+        other.first_name = 'Bob'
+        other.save()
+
+        user.refresh_from_db()
+        user.first_name = original
+        user.save()
+
+        self.patient.refresh_from_db()
+        self.assertEqual(self.patient.first_name, original)
+
+
+class UserFullNameTests(TestCase):
+    def test_full_name_follows_unsaved_changes(self):
+        user = User(email='pat@example.com', first_name='Pat', last_name='Smith')
+        self.assertEqual(user.full_name, 'Pat Smith')
+
+        user.first_name = 'Patty'
+        self.assertEqual(user.full_name, 'Patty Smith')
+
+    def test_sort_name_is_stored_last_name_first(self):
+        user = make_user(first_name='Pat', last_name='Smith')
+        user.refresh_from_db()
+        self.assertEqual(user.sort_name, 'Smith, Pat')
+
+
+class ChangelistQueryCountTests(TestCase):
+    """
+    Each admin changelist must run the same number of queries however many
+    rows it renders.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.superuser = User.objects.create_superuser(
+            email='admin@example.com', password='s3cret-pass',
+            first_name='Ada', last_name='Admin'
+        )
+
+    def setUp(self):
+        self.client.force_login(self.superuser)
+        self.patient = make_patient()
+        self.doctor = make_doctor()
+        self.sequence = count(1)
+
+    def assertConstantQueries(self, model, create_row):
+        url = reverse(f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist')
+        for _ in range(5):
+            create_row()
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        rows = response.context['cl'].result_count
+
+        for _ in range(5):
+            create_row()
+        cache.clear()
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, rows + 5)
+
+    def test_user_changelist(self):
+        self.assertConstantQueries(User, make_user)
+
+    def test_patient_changelist(self):
+        self.assertConstantQueries(Patient, make_patient)
+
+    def test_doctor_changelist(self):
+        self.assertConstantQueries(Doctor, make_doctor)
+
+    def test_diagnosis_history_changelist(self):
+        self.assertConstantQueries(DiagnosisHistory, lambda: DiagnosisHistory.objects.create(
+            patient=self.patient,
+            doctor=self.doctor,
+            month=1,
+            year=1999 + next(self.sequence),
+            **RecomputeLevelsTests.BASELINE
+        ))
+
+    def test_diagnostic_list_changelist(self):
+        self.assertConstantQueries(DiagnosticList, lambda: DiagnosticList.objects.create(
+            patient=self.patient,
+            doctor=self.doctor,
+            name=f'Diagnosis {next(self.sequence)}'
+        ))
+
+    def test_lab_result_changelist(self):
+        self.assertConstantQueries(LabResult, lambda: LabResult.objects.create(
+            patient=self.patient,
+            doctor=self.doctor,
+            name=f'Test {next(self.sequence)}',
+            performed_date=date(2024, 1, 1)
+        ))
+
+    def test_appointment_changelist(self):
+        self.assertConstantQueries(Appointment, lambda: Appointment.objects.create(
+            patient=self.patient,
+            doctor=self.doctor,
+            appointment_date=date(2024, 1, 1) + timedelta(days=next(self.sequence)),
+            appointment_time=time(9, 0)
+        ))
+
+
+class CaseInsensitiveIdentifierTests(TestCase):
+    def test_login_with_mixed_case_email(self):
+        user = make_user(email='Pat.Smith@Example.com')
+        self.assertEqual(user.email, 'pat.smith@example.com')
+
+        self.assertEqual(authenticate(username='PAT.SMITH@example.COM', password='s3cret-pass'), user)
+
+    def test_admin_form_rejects_email_differing_only_by_case(self):
+        make_user(email='pat@example.com')
+        superuser = User.objects.create_superuser(email='admin@example.com', password='s3cret-pass')
+        request = RequestFactory().get('/')
+        request.user = superuser
+        form_class = admin.site._registry[User].get_form(request)
+
+        form = form_class(data={
+            'email': 'Pat@Example.COM',
+            'password1': 'An0ther-s3cret-pass',
+            'password2': 'An0ther-s3cret-pass',
+            'usable_password': 'true',
+            'first_name': 'Pat',
+            'last_name': 'Smith',
+            'user_type': 'patient',
+            'is_active': True,
+        })
+
+        self.assertFalse(form.is_valid())
+        self.assertIn('email', form.errors)
+
+    def test_license_number_case_variant_fails_unique_validation(self):
+        existing = make_doctor(license_number='ab-123')
+        self.assertEqual(existing.license_number, 'AB-123')
+
+        duplicate = Doctor(
+            user=make_user('doctor'),
+            specialization='surgeon',
+            license_number=' ab-123 '
+        )
+        with self.assertRaises(ValidationError) as raised:
+            duplicate.full_clean()
+        self.assertIn('license_number', raised.exception.message_dict)
+
+    def test_padded_license_number_is_normalized_before_length_check(self):
+        doctor = Doctor(
+            user=make_user('doctor'),
+            specialization='surgeon',
+            license_number='  ' + 'x' * 50 + '  '
+        )
+        doctor.full_clean()
+        self.assertEqual(doctor.license_number, 'X' * 50)
+
+
+class AgeExpressionTests(TestCase):
+    def assertAgeMatchesProperty(self, born):
+        patient = make_patient(date_of_birth=born)
+        annotated = Patient.objects.annotate(_age=age_expression()).get(pk=patient.pk)
+        self.assertEqual(annotated._age, patient.age)
+
+    def test_birthday_today_tomorrow_and_yesterday(self):
+        # 28 years back keeps leap days valid: today's year and that year
+        # are either both leap years or both not
+        born = date.today().replace(year=date.today().year - 28)
+        for birthday in (born, born + timedelta(days=1), born - timedelta(days=1)):
+            with self.subTest(born=birthday):
+                self.assertAgeMatchesProperty(birthday)
+
+    def test_leap_day_birth_date(self):
+        self.assertAgeMatchesProperty(date(2000, 2, 29))
+
+
+class UUID7Tests(SimpleTestCase):
+    def test_version_and_variant(self):
+        key = uuid7()
+        self.assertEqual(key.version, 7)
+        self.assertEqual(key.variant, uuid.RFC_4122)
+
+    def test_later_millisecond_sorts_after(self):
+        now_ns = time_module.time_ns()
+        with mock.patch.object(time_module, 'time_ns', return_value=now_ns):
+            earlier = [uuid7() for _ in range(20)]
+        with mock.patch.object(time_module, 'time_ns', return_value=now_ns + 1_000_000):
+            later = [uuid7() for _ in range(20)]
+
+        self.assertLess(max(earlier), min(later))
+        self.assertLess(max(key.hex for key in earlier), min(key.hex for key in later))
+
+
+class DiagnosisHistoryOrderingTests(TestCase):
+    def test_months_sort_chronologically(self):
+        patient = make_patient()
+        for month in (1, 4):
+            DiagnosisHistory.objects.create(
+                patient=patient, month=month, year=2024, **RecomputeLevelsTests.BASELINE
+            )
+
+        self.assertEqual(
+            list(DiagnosisHistory.objects.filter(patient=patient).values_list('month', flat=True)),
+            [4, 1]
+        )
+        self.assertEqual(
+            list(DiagnosisHistory.objects.filter(patient=patient).order_by('month').values_list('month', flat=True)),
+            [1, 4]
+        )
+
+
+class ReadingConstraintTests(TestCase):
+    """Range checks are enforced by the database, not only by validators."""
+
+    def setUp(self):
+        self.patient = make_patient()
+
+    def test_update_out_of_range_reading_is_rejected(self):
+        history = DiagnosisHistory.objects.create(
+            patient=self.patient, month=1, year=2024, **RecomputeLevelsTests.BASELINE
+        )
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            DiagnosisHistory.objects.filter(pk=history.pk).update(heart_rate_value=500)
+
+    def test_bulk_create_out_of_range_reading_is_rejected(self):
+        values = dict(RecomputeLevelsTests.BASELINE, blood_pressure_systolic_value=300)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            DiagnosisHistory.objects.bulk_create([
+                DiagnosisHistory(patient=self.patient, month=2, year=2024, **values)
+            ])
+
+    def test_update_doctor_experience_above_max_is_rejected(self):
+        doctor = make_doctor(years_of_experience=10)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Doctor.objects.filter(pk=doctor.pk).update(years_of_experience=80)
+
+
+class CachedCountPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.superuser = User.objects.create_superuser(email='admin@example.com', password='s3cret-pass')
+        for _ in range(3):
+            make_patient()
+        for _ in range(2):
+            make_doctor()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_repeat_count_is_served_from_cache(self):
+        queryset = User.objects.filter(user_type='patient')
+        with self.assertNumQueries(1):
+            self.assertEqual(CachedCountPaginator(queryset, 10).count, 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(CachedCountPaginator(queryset.order_by('-email'), 10).count, 3)
+
+    def test_filters_are_cached_separately(self):
+        patients = CachedCountPaginator(User.objects.filter(user_type='patient'), 10)
+        doctors = CachedCountPaginator(User.objects.filter(user_type='doctor'), 10)
+        self.assertEqual(patients.count, 3)
+        with self.assertNumQueries(1):
+            self.assertEqual(doctors.count, 2)
+
+    def test_changelist_querystrings_get_their_own_counts(self):
+        self.client.force_login(self.superuser)
+        url = reverse('admin:app_user_changelist')
+
+        with CaptureQueriesContext(connection) as first:
+            response = self.client.get(url, {'user_type__exact': 'patient'})
+        self.assertEqual(response.context['cl'].result_count, 3)
+        with self.assertNumQueries(len(first) - 1):
+            response = self.client.get(url, {'user_type__exact': 'patient'})
+        self.assertEqual(response.context['cl'].result_count, 3)
+
+        response = self.client.get(url, {'user_type__exact': 'doctor'})
+        self.assertEqual(response.context['cl'].result_count, 2)
+        response = self.client.get(url, {'q': 'admin@example.com'})
+        self.assertEqual(response.context['cl'].result_count, 1)